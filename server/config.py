@@ -0,0 +1,44 @@
+from functools import lru_cache
+from typing import Optional
+from pydantic import field_validator
+from pydantic_settings import BaseSettings
+from dotenv import load_dotenv
+
+# Same .env discovery as the rest of the app (searches up from this file)
+load_dotenv()
+
+class Settings(BaseSettings):
+    """Settings read from the environment once per process"""
+
+    # Database - default to SQLite for simplicity
+    database_url: str = "sqlite:///./sisyphus.db"
+    debug: bool = False
+    slow_query_ms: float = 100
+
+    # Server
+    environment: Optional[str] = None
+    allowed_origins: str = "http://localhost:3000"
+    run_create_all: bool = False
+    host: str = "0.0.0.0"
+    port: int = 8000
+    web_concurrency: int = 1
+
+    # bcrypt processes per web worker
+    password_hash_workers: int = 2
+
+    # Redis (optional - for task scheduling)
+    redis_enabled: bool = False
+    redis_url: str = "redis://localhost:6379"
+
+    @field_validator("debug", "run_create_all", "redis_enabled", mode="before")
+    @classmethod
+    def _parse_flag(cls, value):
+        # Anything that isn't a recognised "on" value is off, instead of
+        # failing at import on e.g. DEBUG=yes-please
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return value
+
+@lru_cache()
+def get_settings() -> Settings:
+    return Settings()
@@ -1,18 +1,17 @@
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
-import os
+from fastapi.responses import ORJSONResponse
+from starlette.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
 
 from routes import auth, tasks, users
-from utils.database import engine
+from config import get_settings
+from utils.database import engine, warm_up_pool
+from utils.middleware import ASGICORSMiddleware, ASGITrustedHostMiddleware
 from models.base import Base
 
 # Load environment variables
 load_dotenv()
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+settings = get_settings()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -20,28 +19,45 @@ app = FastAPI(
     description="A productivity app where tasks reset daily, embodying the Sisyphus metaphor",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
-# Get CORS origins from environment
-allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+# Get CORS origins from settings
+allowed_origins = settings.allowed_origins.split(",")
+
+# Response compression (innermost, so CORS preflights never reach it)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 # CORS middleware
 app.add_middleware(
-    CORSMiddleware,
+    ASGICORSMiddleware,
     allow_origins=allowed_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
 )
 
 # Trusted host middleware for production
-if os.getenv("ENVIRONMENT") == "production":
+if settings.environment == "production":
     app.add_middleware(
-        TrustedHostMiddleware,
+        ASGITrustedHostMiddleware,
         allowed_hosts=["*"]  # Update with your domain in production
     )
 
+# Create database tables only when explicitly requested (e.g. local
+# development); deployed environments run migrate_create_tables.py once
+# before starting the server (see the Dockerfiles, render.yaml and
+# docker-compose.prod.yml) so workers don't all hit the database on boot
+@app.on_event("startup")
+async def create_tables():
+    if not settings.run_create_all:
+        return
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+# Fill the connection pool before traffic arrives
+@app.on_event("startup")
+async def warm_up_database():
+    await warm_up_pool()
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
@@ -59,11 +75,23 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "sisyphus-api"}
 
+# Connection pool snapshot for diagnosing pool exhaustion; only registered
+# when DEBUG is explicitly enabled
+if settings.debug:
+    @app.get("/debug/pool", include_in_schema=False)
+    async def pool_status():
+        return {"status": engine.pool.status()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
         "main:app",
-        host=os.getenv("HOST", "0.0.0.0"),
-        port=int(os.getenv("PORT", 8000)),
-        reload=os.getenv("DEBUG", "True").lower() == "true"
+        host=settings.host,
+        port=settings.port,
+        reload=settings.debug,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        log_level="warning",
+        workers=settings.web_concurrency
     ) 
\ No newline at end of file
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Migration script to add composite (user_id, ...) indexes to tasks table
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from utils.database import DATABASE_URL
+
+# Index name -> indexed columns (mirrors Task.__table_args__)
+TASK_INDEXES = {
+    "ix_tasks_user_completed": ("user_id", "is_completed"),
+    "ix_tasks_user_due": ("user_id", "due_date"),
+    "ix_tasks_user_category": ("user_id", "category"),
+    "ix_tasks_user_id_pk": ("user_id", "id"),
+    "ix_tasks_user_created": ("user_id", "created_at"),
+}
+
+def migrate():
+    """Create composite indexes on tasks table"""
+    engine = create_engine(DATABASE_URL)
+    is_postgres = engine.dialect.name == "postgresql"
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, columns in TASK_INDEXES.items():
+            concurrently = "CONCURRENTLY " if is_postgres else ""
+            print(f"Creating index {name}...")
+            conn.execute(text(
+                f"CREATE INDEX {concurrently}IF NOT EXISTS {name} "
+                f"ON tasks ({', '.join(columns)})"
+            ))
+            print(f"✓ Created index {name}")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
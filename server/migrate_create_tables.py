@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Migration script to create any missing tables (users, tasks) and their indexes
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from utils.database import DATABASE_URL, Base
+from models.user import User  # noqa: F401 - registers the table on Base
+from models.task import Task  # noqa: F401 - registers the table on Base
+
+def migrate():
+    """Create all tables defined on the models that don't exist yet"""
+    engine = create_engine(DATABASE_URL)
+
+    print("Creating missing tables...")
+    # checkfirst (the default) leaves existing tables and data untouched
+    Base.metadata.create_all(bind=engine)
+    print("✓ Tables are up to date")
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
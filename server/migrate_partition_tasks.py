@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Migration script to range-partition the tasks table by created_at day (PostgreSQL only)
+
+Lets the daily purge drop whole expired partitions instead of deleting rows.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, text
+from utils.database import DATABASE_URL
+from utils.scheduler import task_partition_ddl, TASK_PARTITION_DAYS_AHEAD
+from migrate_add_task_indexes import TASK_INDEXES
+
+def migrate():
+    """Rebuild tasks as a table partitioned by created_at, one partition per day"""
+    engine = create_engine(DATABASE_URL)
+    if engine.dialect.name != "postgresql":
+        print("Partitioning is only supported on PostgreSQL, skipping")
+        return
+
+    with engine.begin() as conn:
+        # Check if tasks is already partitioned
+        already_partitioned = conn.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_partitioned_table
+                WHERE partrelid = to_regclass('tasks')
+            )
+        """)).scalar()
+        if already_partitioned:
+            print("tasks is already partitioned")
+            return
+
+        print("Renaming existing tasks table...")
+        conn.execute(text("ALTER TABLE tasks RENAME TO tasks_unpartitioned"))
+        conn.execute(text("ALTER INDEX tasks_pkey RENAME TO tasks_unpartitioned_pkey"))
+        # Keep the id sequence when the old table is dropped
+        conn.execute(text("ALTER SEQUENCE tasks_id_seq OWNED BY NONE"))
+
+        # The partition key must be non-null and part of the primary key
+        conn.execute(text("UPDATE tasks_unpartitioned SET created_at = now() WHERE created_at IS NULL"))
+
+        print("Creating partitioned tasks table...")
+        conn.execute(text("""
+            CREATE TABLE tasks (LIKE tasks_unpartitioned INCLUDING DEFAULTS)
+            PARTITION BY RANGE (created_at)
+        """))
+        conn.execute(text("ALTER TABLE tasks ALTER COLUMN created_at SET NOT NULL"))
+        conn.execute(text("ALTER TABLE tasks ADD PRIMARY KEY (id, created_at)"))
+        conn.execute(text("ALTER TABLE tasks ADD FOREIGN KEY (user_id) REFERENCES users (id)"))
+        conn.execute(text("ALTER SEQUENCE tasks_id_seq OWNED BY tasks.id"))
+
+        # Daily partitions from the oldest task through the scheduler's
+        # look-ahead window, plus a default partition as a safety net
+        oldest = conn.execute(text("SELECT min(created_at) FROM tasks_unpartitioned")).scalar()
+        today = datetime.now(timezone.utc).date()
+        day = oldest.astimezone(timezone.utc).date() if oldest else today
+        while day <= today + timedelta(days=TASK_PARTITION_DAYS_AHEAD):
+            conn.execute(text(task_partition_ddl(day)))
+            day += timedelta(days=1)
+        conn.execute(text("CREATE TABLE tasks_default PARTITION OF tasks DEFAULT"))
+        print("✓ Created daily partitions")
+
+        print("Copying tasks...")
+        conn.execute(text("INSERT INTO tasks SELECT * FROM tasks_unpartitioned"))
+        conn.execute(text("DROP TABLE tasks_unpartitioned"))
+        print("✓ Copied tasks")
+
+        # Indexes on the parent are created on every partition
+        conn.execute(text("CREATE INDEX ix_tasks_id ON tasks (id)"))
+        for name, columns in TASK_INDEXES.items():
+            conn.execute(text(f"CREATE INDEX {name} ON tasks ({', '.join(columns)})"))
+        print("✓ Created indexes")
+
+        print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
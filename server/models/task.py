@@ -1,8 +1,33 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Date
+from datetime import date
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Date, Index, and_, case, literal
 from sqlalchemy.sql import func
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_method
 from sqlalchemy.orm import relationship
 from utils.database import Base
 
+class days_until(FunctionElement):
+    """SQL expression for the number of days from a reference date until a DATE column"""
+    type = Integer()
+    inherit_cache = True
+
+@compiles(days_until)
+def _compile_days_until(element, compiler, **kw):
+    # PostgreSQL: date - date yields an integer number of days
+    due, today = (compiler.process(arg, **kw) for arg in element.clauses)
+    return "(%s - %s)" % (due, today)
+
+@compiles(days_until, "sqlite")
+def _compile_days_until_sqlite(element, compiler, **kw):
+    due, today = (compiler.process(arg, **kw) for arg in element.clauses)
+    return "CAST(julianday(%s) - julianday(%s) AS INTEGER)" % (due, today)
+
+def _today():
+    # Bind the app server's date rather than the database's CURRENT_DATE,
+    # so the SQL and Python sides of the hybrids agree
+    return literal(date.today(), Date)
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -18,24 +43,44 @@ class Task(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
 
+    # Composite indexes matching the per-user filters in routes/tasks.py and
+    # utils/scheduler.py (keep in sync with migrate_add_task_indexes.py)
+    __table_args__ = (
+        Index("ix_tasks_user_completed", "user_id", "is_completed"),
+        Index("ix_tasks_user_due", "user_id", "due_date"),
+        Index("ix_tasks_user_category", "user_id", "category"),
+        Index("ix_tasks_user_id_pk", "user_id", "id"),
+        # Daily purge: user_id IN (reset bucket) AND created_at < cutoff
+        Index("ix_tasks_user_created", "user_id", "created_at"),
+    )
+
     # Relationship with user
     user = relationship("User", back_populates="tasks")
 
     def __repr__(self):
         return f"<Task(id={self.id}, title='{self.title}', user_id={self.user_id})>"
 
+    @hybrid_method
     def is_overdue(self):
         """Check if task is overdue based on due date"""
-        from datetime import date
         if not self.due_date:
             return False
         
         today = date.today()
         return today > self.due_date and not self.is_completed
 
+    @is_overdue.expression
+    def is_overdue(cls):
+        """SQL version of is_overdue, usable in WHERE clauses"""
+        return and_(
+            cls.due_date.isnot(None),
+            cls.due_date < _today(),
+            cls.is_completed == False
+        )
+
+    @hybrid_method
     def days_until_due(self):
         """Calculate days until due date"""
-        from datetime import date
         if not self.due_date:
             return None
         
@@ -43,6 +88,12 @@ class Task(Base):
         delta = self.due_date - today
         return delta.days
 
+    @days_until_due.expression
+    def days_until_due(cls):
+        """SQL version of days_until_due"""
+        return days_until(cls.due_date, _today())
+
+    @hybrid_method
     def due_status(self):
         """Get the due status of the task"""
         if not self.due_date:
@@ -61,4 +112,17 @@ class Task(Base):
         elif days <= 7:
             return "due_soon"
         else:
-            return "due_later" 
\ No newline at end of file
+            return "due_later"
+
+    @due_status.expression
+    def due_status(cls):
+        """SQL version of due_status, evaluated by the database in one pass"""
+        days = days_until(cls.due_date, _today())
+        return case(
+            (cls.due_date.is_(None), "no_due_date"),
+            (days < 0, "overdue"),
+            (days == 0, "due_today"),
+            (days == 1, "due_tomorrow"),
+            (days <= 7, "due_soon"),
+            else_="due_later"
+        )
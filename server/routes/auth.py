@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Body
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from pydantic import BaseModel
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status, Body
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, ConfigDict
 
-from utils.database import get_db
+from utils.database import get_db, dialect_insert
 from utils.auth import (
     authenticate_user, 
     create_access_token, 
     create_refresh_token,
-    get_password_hash,
+    get_password_hash_async,
     get_current_user
 )
 from models.user import User
@@ -18,57 +19,72 @@ from schemas import UserCreate, Token, LoginRequest, UserResponse, MessageRespon
 class RefreshTokenRequest(BaseModel):
     refresh_token: str
     
-    class Config:
-        # Allow extra fields but ignore them
-        extra = "ignore"
+    # Allow extra fields but ignore them
+    model_config = ConfigDict(extra="ignore")
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+async def _check_registration_conflict(db: AsyncSession, user_data: UserCreate):
+    """Raise 400 if the email or username is already taken"""
+    result = await db.execute(
+        select(User.email).where(
+            (User.email == user_data.email) | (User.username == user_data.username)
+        )
+    )
+    emails = result.scalars().all()
+    if not emails:
+        return
+    
+    await db.rollback()
+    if user_data.email in emails:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Username already taken"
+    )
 
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
-    # Check if user already exists
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    # Cheap indexed lookup first, so duplicate signups never pay for a hash
+    await _check_registration_conflict(db, user_data)
     
-    if existing_user:
-        if existing_user.email == user_data.email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
-    
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    db_user = User(
-        email=user_data.email,
-        username=user_data.username,
-        full_name=user_data.full_name,
-        hashed_password=hashed_password
+    # Create new user; the unique constraints on email/username make this
+    # atomic under concurrent signups
+    hashed_password = await get_password_hash_async(user_data.password)
+    result = await db.execute(
+        dialect_insert(User)
+        .values(
+            email=user_data.email,
+            username=user_data.username,
+            full_name=user_data.full_name,
+            hashed_password=hashed_password
+        )
+        .on_conflict_do_nothing()
+        .returning(User)
     )
+    db_user = result.scalar_one_or_none()
     
-    try:
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        return db_user
-    except IntegrityError:
-        db.rollback()
+    if db_user is None:
+        # Lost a race with a concurrent signup: report which field is taken
+        await _check_registration_conflict(db, user_data)
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User registration failed"
+            detail="Registration failed, please try again"
         )
+    
+    await db.commit()
+    return db_user
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_db)):
     """Login user and return JWT tokens"""
-    user = authenticate_user(db, login_data.username, login_data.password)
+    user = await authenticate_user(db, login_data.username, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -93,22 +109,13 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     }
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(request: RefreshTokenRequest = Body(...), raw_request: Request = None, db: Session = Depends(get_db)):
+async def refresh_token(request: RefreshTokenRequest = Body(...), db: AsyncSession = Depends(get_db)):
     """Refresh access token using refresh token"""
     from utils.auth import verify_token
     
-    # Add debugging
-    print(f"Refresh token request received: {request.refresh_token[:20]}...")
-    print(f"Request object type: {type(request)}")
-    print(f"Request object: {request}")
-    if raw_request:
-        print(f"Raw request headers: {dict(raw_request.headers)}")
-        print(f"Raw request body: {await raw_request.body()}")
-    
     try:
         payload = verify_token(request.refresh_token, "refresh")
         if payload is None:
-            print("Token verification failed - payload is None")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token",
@@ -117,17 +124,19 @@ async def refresh_token(request: RefreshTokenRequest = Body(...), raw_request: R
         
         username: str = payload.get("sub")
         if not username:
-            print("No username in payload")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token - no username",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        user = db.query(User).filter(User.username == username).first()
+        # Only the columns needed here, as a plain row (no ORM instance)
+        result = await db.execute(
+            select(User.username, User.is_active).where(User.username == username)
+        )
+        user = result.one_or_none()
         
         if not user:
-            print(f"User not found: {username}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token - user not found",
@@ -135,7 +144,6 @@ async def refresh_token(request: RefreshTokenRequest = Body(...), raw_request: R
             )
         
         if not user.is_active:
-            print(f"User inactive: {username}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token - user inactive",
@@ -146,8 +154,6 @@ async def refresh_token(request: RefreshTokenRequest = Body(...), raw_request: R
         access_token = create_access_token(data={"sub": user.username})
         new_refresh_token = create_refresh_token(data={"sub": user.username})
         
-        print(f"Token refresh successful for user: {username}")
-        
         return {
             "access_token": access_token,
             "token_type": "bearer",
@@ -157,19 +163,19 @@ async def refresh_token(request: RefreshTokenRequest = Body(...), raw_request: R
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
-    except Exception as e:
-        print(f"Unexpected error in refresh token: {str(e)}")
+    except Exception:
+        logger.exception("Unexpected error in refresh token")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during token refresh"
         )
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
     return current_user
 
 @router.post("/logout", response_model=MessageResponse)
-def logout():
+async def logout():
     """Logout user (client should discard tokens)"""
     return {"message": "Successfully logged out"} 
\ No newline at end of file
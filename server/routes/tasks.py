@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, insert, update, delete, func, case, bindparam, not_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, date
 
-from utils.database import get_db
+from utils.database import get_db, id_filters
 from utils.auth import get_current_user
 from models.user import User
 from models.task import Task
@@ -12,13 +14,36 @@ from schemas import (
     TaskUpdate, 
     TaskResponse, 
     TaskListResponse,
+    BulkTaskIDs,
     MessageResponse
 )
 
 router = APIRouter()
 
+# Columns serialized by TaskResponse, selected directly for read-only list paths
+TASK_RESPONSE_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.is_completed,
+    Task.priority,
+    Task.category,
+    Task.due_date,
+    Task.user_id,
+    Task.created_at,
+    Task.updated_at,
+    Task.completed_at,
+)
+
+# Hot single-task lookup, built once so its compiled form is cached and
+# reused with bound parameters on every call
+SELECT_USER_TASK = select(Task).where(
+    Task.id == bindparam("task_id"),
+    Task.user_id == bindparam("user_id")
+)
+
 @router.get("/", response_model=TaskListResponse)
-def get_tasks(
+async def get_tasks(
     completed: Optional[bool] = Query(None, description="Filter by completion status"),
     priority: Optional[int] = Query(None, description="Filter by priority (1-3)"),
     category: Optional[str] = Query(None, description="Filter by category"),
@@ -27,13 +52,13 @@ def get_tasks(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all tasks for the current user with optional filtering"""
-    query = db.query(Task).filter(Task.user_id == current_user.id)
+    query = select(*TASK_RESPONSE_COLUMNS).where(Task.user_id == current_user.id)
     
     if completed is not None:
-        query = query.filter(Task.is_completed == completed)
+        query = query.where(Task.is_completed == completed)
     
     if priority is not None:
         if priority not in [1, 2, 3]:
@@ -41,105 +66,131 @@ def get_tasks(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Priority must be 1, 2, or 3"
             )
-        query = query.filter(Task.priority == priority)
+        query = query.where(Task.priority == priority)
     
     if category is not None:
-        query = query.filter(Task.category == category)
+        query = query.where(Task.category == category)
     
     if due_date is not None:
-        query = query.filter(Task.due_date == due_date)
+        query = query.where(Task.due_date == due_date)
     
     if overdue is not None:
         if overdue:
             # Filter for overdue tasks (due_date < today and not completed)
-            today = date.today()
-            query = query.filter(
-                Task.due_date < today,
-                Task.is_completed == False
-            )
+            query = query.where(Task.is_overdue())
         else:
             # Filter for non-overdue tasks
-            today = date.today()
-            query = query.filter(
-                (Task.due_date >= today) | (Task.due_date.is_(None)) | (Task.is_completed == True)
-            )
+            query = query.where(~Task.is_overdue())
+    
+    # Fetch the page together with the total/completed counts of the whole
+    # filtered set: window functions are evaluated before OFFSET/LIMIT
+    completed_flag = case((Task.is_completed == True, 1), else_=0)
+    page_query = query.add_columns(
+        func.count().over().label("total"),
+        func.sum(completed_flag).over().label("completed")
+    )
+    result = await db.execute(page_query.offset(skip).limit(limit))
+    rows = result.mappings().all()
     
-    # Get total counts
-    total_tasks = query.count()
-    completed_tasks = query.filter(Task.is_completed == True).count()
+    if rows:
+        total_tasks = rows[0]["total"]
+        completed_tasks = rows[0]["completed"]
+    else:
+        # Page past the end (or no tasks): counts still describe the filtered set
+        counts = await db.execute(
+            select(func.count(), func.coalesce(func.sum(completed_flag), 0))
+            .select_from(Task)
+            .where(query.whereclause)
+        )
+        total_tasks, completed_tasks = counts.one()
     pending_tasks = total_tasks - completed_tasks
     
-    # Apply pagination
-    tasks = query.offset(skip).limit(limit).all()
+    # Rows come straight from our own table, so skip ORM hydration and
+    # Pydantic validation and build the response models directly
+    tasks = [
+        TaskResponse.model_construct(**{column.key: row[column.key] for column in TASK_RESPONSE_COLUMNS})
+        for row in rows
+    ]
     
-    return TaskListResponse(
+    # Serialize directly with orjson instead of re-validating through response_model
+    return ORJSONResponse(TaskListResponse.model_construct(
         tasks=tasks,
         total=total_tasks,
         completed=completed_tasks,
         pending=pending_tasks
-    )
+    ).model_dump())
 
 @router.get("/categories", response_model=List[str])
-def get_task_categories(
+async def get_task_categories(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all unique categories for the current user's tasks"""
-    categories = db.query(Task.category).filter(
+    filters = (
         Task.user_id == current_user.id,
-        Task.category.isnot(None)
-    ).distinct().all()
+        Task.category.isnot(None),
+        Task.category != ""
+    )
     
-    return [cat[0] for cat in categories if cat[0]]
+    if db.bind.dialect.name == "postgresql":
+        # Single row aggregated over the (user_id, category) index
+        categories = await db.scalar(
+            select(func.array_agg(Task.category.distinct())).where(*filters)
+        )
+        return categories or []
+    
+    result = await db.execute(select(Task.category).where(*filters).distinct())
+    return result.scalars().all()
 
 @router.get("/overdue", response_model=TaskListResponse)
-def get_overdue_tasks(
+async def get_overdue_tasks(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all overdue tasks for the current user"""
-    today = date.today()
-    tasks = db.query(Task).filter(
-        Task.user_id == current_user.id,
-        Task.due_date < today,
-        Task.is_completed == False
-    ).all()
+    result = await db.execute(
+        select(Task).where(
+            Task.user_id == current_user.id,
+            Task.is_overdue()
+        )
+    )
+    tasks = result.scalars().all()
     
-    return TaskListResponse(
+    return ORJSONResponse(TaskListResponse(
         tasks=tasks,
         total=len(tasks),
         completed=0,
         pending=len(tasks)
-    )
+    ).model_dump())
 
 @router.post("/", response_model=TaskResponse)
-def create_task(
+async def create_task(
     task_data: TaskCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new task for the current user"""
-    db_task = Task(
-        **task_data.dict(),
-        user_id=current_user.id
+    # INSERT ... RETURNING brings back server defaults without a refresh
+    db_task = await db.scalar(
+        insert(Task)
+        .values(**task_data.model_dump(), user_id=current_user.id)
+        .returning(Task)
     )
     
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    await db.commit()
     return db_task
 
 @router.get("/{task_id}", response_model=TaskResponse)
-def get_task(
+async def get_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific task by ID"""
-    task = db.query(Task).filter(
-        Task.id == task_id,
-        Task.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        SELECT_USER_TASK, {"task_id": task_id, "user_id": current_user.id}
+    )
+    task = result.scalar_one_or_none()
     
     if not task:
         raise HTTPException(
@@ -150,17 +201,41 @@ def get_task(
     return task
 
 @router.put("/{task_id}", response_model=TaskResponse)
-def update_task(
+async def update_task(
     task_id: int,
     task_data: TaskUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a specific task"""
-    task = db.query(Task).filter(
-        Task.id == task_id,
-        Task.user_id == current_user.id
-    ).first()
+    update_data = task_data.model_dump(exclude_unset=True)
+    
+    if not update_data:
+        # Nothing to change, just return the current task
+        task = await db.scalar(
+            SELECT_USER_TASK, {"task_id": task_id, "user_id": current_user.id}
+        )
+    else:
+        # Handle completion status
+        if "is_completed" in update_data:
+            if update_data["is_completed"]:
+                # Mark as completed, keeping the original time if it already was
+                update_data["completed_at"] = case(
+                    (Task.is_completed == True, Task.completed_at),
+                    else_=datetime.utcnow()
+                )
+            else:
+                # Mark as incomplete
+                update_data["completed_at"] = None
+        
+        # Single UPDATE ... RETURNING instead of SELECT + flush
+        task = await db.scalar(
+            update(Task)
+            .where(Task.id == task_id, Task.user_id == current_user.id)
+            .values(**update_data)
+            .returning(Task)
+            .execution_options(synchronize_session=False)
+        )
     
     if not task:
         raise HTTPException(
@@ -168,59 +243,54 @@ def update_task(
             detail="Task not found"
         )
     
-    # Update task fields
-    update_data = task_data.dict(exclude_unset=True)
-    
-    # Handle completion status
-    if "is_completed" in update_data:
-        if update_data["is_completed"] and not task.is_completed:
-            # Mark as completed
-            update_data["completed_at"] = datetime.utcnow()
-        elif not update_data["is_completed"]:
-            # Mark as incomplete
-            update_data["completed_at"] = None
-    
-    for field, value in update_data.items():
-        setattr(task, field, value)
-    
-    db.commit()
-    db.refresh(task)
+    await db.commit()
     return task
 
 @router.delete("/{task_id}", response_model=MessageResponse)
-def delete_task(
+async def delete_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a specific task"""
-    task = db.query(Task).filter(
-        Task.id == task_id,
-        Task.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        delete(Task)
+        .where(Task.id == task_id, Task.user_id == current_user.id)
+        .execution_options(synchronize_session=False)
+    )
     
-    if not task:
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
     
-    db.delete(task)
-    db.commit()
+    await db.commit()
     
     return {"message": "Task deleted successfully"}
 
 @router.post("/{task_id}/toggle", response_model=TaskResponse)
-def toggle_task_completion(
+async def toggle_task_completion(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Toggle task completion status"""
-    task = db.query(Task).filter(
-        Task.id == task_id,
-        Task.user_id == current_user.id
-    ).first()
+    # SET expressions see the old row, so the flip and completed_at can be
+    # done in one UPDATE ... RETURNING
+    task = await db.scalar(
+        update(Task)
+        .where(Task.id == task_id, Task.user_id == current_user.id)
+        .values(
+            is_completed=not_(Task.is_completed),
+            completed_at=case(
+                (Task.is_completed == True, None),
+                else_=datetime.utcnow()
+            )
+        )
+        .returning(Task)
+        .execution_options(synchronize_session=False)
+    )
     
     if not task:
         raise HTTPException(
@@ -228,119 +298,135 @@ def toggle_task_completion(
             detail="Task not found"
         )
     
-    task.is_completed = not task.is_completed
-    if task.is_completed:
-        task.completed_at = datetime.utcnow()
-    else:
-        task.completed_at = None
-    
-    db.commit()
-    db.refresh(task)
+    await db.commit()
     return task
 
 @router.post("/purge-completed", response_model=MessageResponse)
-def purge_completed_tasks(
+async def purge_completed_tasks(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete all completed tasks for the current user"""
-    deleted_count = db.query(Task).filter(
-        Task.user_id == current_user.id,
-        Task.is_completed == True
-    ).delete()
+    result = await db.execute(
+        delete(Task)
+        .where(
+            Task.user_id == current_user.id,
+            Task.is_completed == True
+        )
+        .execution_options(synchronize_session=False)
+    )
+    deleted_count = result.rowcount
     
-    db.commit()
+    await db.commit()
     
     return {"message": f"Deleted {deleted_count} completed tasks"}
 
 # Bulk Operations Endpoints
+
+async def _verify_task_ownership(db: AsyncSession, task_ids: List[int], user_id: int):
+    """Raise 404 unless every id in task_ids is a task owned by user_id"""
+    owned = 0
+    for id_filter in id_filters(Task.id, task_ids, db.bind.dialect.name):
+        owned += await db.scalar(
+            select(func.count()).select_from(Task).where(
+                id_filter,
+                Task.user_id == user_id
+            )
+        )
+    
+    if owned != len(task_ids):
+        raise HTTPException(status_code=404, detail="Some tasks not found or not accessible")
+
 @router.delete("/bulk/delete")
-def bulk_delete_tasks(
-    task_ids: List[int],
-    db: Session = Depends(get_db),
+async def bulk_delete_tasks(
+    payload: BulkTaskIDs,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Delete multiple tasks"""
-    if not task_ids:
-        raise HTTPException(status_code=400, detail="No task IDs provided")
+    task_ids = payload.task_ids
     
     # Verify all tasks belong to the current user
-    tasks = db.query(Task).filter(
-        Task.id.in_(task_ids),
-        Task.user_id == current_user.id
-    ).all()
-    
-    if len(tasks) != len(task_ids):
-        raise HTTPException(status_code=404, detail="Some tasks not found or not accessible")
-    
-    # Delete all tasks
-    for task in tasks:
-        db.delete(task)
+    await _verify_task_ownership(db, task_ids, current_user.id)
+    
+    # Delete all tasks without loading them
+    deleted_count = 0
+    for id_filter in id_filters(Task.id, task_ids, db.bind.dialect.name):
+        result = await db.execute(
+            delete(Task)
+            .where(
+                id_filter,
+                Task.user_id == current_user.id
+            )
+            .execution_options(synchronize_session=False)
+        )
+        deleted_count += result.rowcount
     
-    db.commit()
-    return {"message": f"Successfully deleted {len(tasks)} tasks"}
+    await db.commit()
+    return {"message": f"Successfully deleted {deleted_count} tasks"}
 
 @router.post("/bulk/complete")
-def bulk_complete_tasks(
-    task_ids: List[int],
-    db: Session = Depends(get_db),
+async def bulk_complete_tasks(
+    payload: BulkTaskIDs,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Mark multiple tasks as completed"""
-    if not task_ids:
-        raise HTTPException(status_code=400, detail="No task IDs provided")
+    task_ids = payload.task_ids
     
-    # Get all tasks that belong to the current user
-    tasks = db.query(Task).filter(
-        Task.id.in_(task_ids),
-        Task.user_id == current_user.id
-    ).all()
-    
-    if len(tasks) != len(task_ids):
-        raise HTTPException(status_code=404, detail="Some tasks not found or not accessible")
+    # Verify all tasks belong to the current user
+    await _verify_task_ownership(db, task_ids, current_user.id)
     
-    # Mark all tasks as completed
+    # Mark all pending tasks as completed without loading them
+    now = datetime.utcnow()
     completed_count = 0
-    for task in tasks:
-        if not task.is_completed:
-            task.is_completed = True
-            task.completed_at = datetime.utcnow()
-            task.updated_at = datetime.utcnow()
-            completed_count += 1
-    
-    db.commit()
+    for id_filter in id_filters(Task.id, task_ids, db.bind.dialect.name):
+        result = await db.execute(
+            update(Task)
+            .where(
+                id_filter,
+                Task.user_id == current_user.id,
+                Task.is_completed == False
+            )
+            .values(is_completed=True, completed_at=now, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        completed_count += result.rowcount
+    
+    await db.commit()
     return {"message": f"Successfully completed {completed_count} tasks"}
 
 @router.put("/bulk/priority")
-def bulk_update_priority(
-    task_ids: List[int],
+async def bulk_update_priority(
+    payload: BulkTaskIDs,
     priority: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update priority for multiple tasks"""
-    if not task_ids:
-        raise HTTPException(status_code=400, detail="No task IDs provided")
+    task_ids = payload.task_ids
     
     if priority not in [1, 2, 3]:
         raise HTTPException(status_code=400, detail="Priority must be 1, 2, or 3")
     
-    # Get all tasks that belong to the current user
-    tasks = db.query(Task).filter(
-        Task.id.in_(task_ids),
-        Task.user_id == current_user.id
-    ).all()
-    
-    if len(tasks) != len(task_ids):
-        raise HTTPException(status_code=404, detail="Some tasks not found or not accessible")
+    # Verify all tasks belong to the current user
+    await _verify_task_ownership(db, task_ids, current_user.id)
     
-    # Update priority for all tasks
+    # Update priority for tasks that don't already have it without loading them
+    now = datetime.utcnow()
     updated_count = 0
-    for task in tasks:
-        if task.priority != priority:
-            task.priority = priority
-            task.updated_at = datetime.utcnow()
-            updated_count += 1
+    for id_filter in id_filters(Task.id, task_ids, db.bind.dialect.name):
+        result = await db.execute(
+            update(Task)
+            .where(
+                id_filter,
+                Task.user_id == current_user.id,
+                Task.priority.is_distinct_from(priority)
+            )
+            .values(priority=priority, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        updated_count += result.rowcount
     
-    db.commit()
+    await db.commit()
     return {"message": f"Successfully updated priority for {updated_count} tasks"} 
\ No newline at end of file
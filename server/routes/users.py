@@ -1,72 +1,89 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 from utils.database import get_db
 from utils.auth import get_current_user, get_password_hash
 from models.user import User
+from models.task import Task
 from schemas import UserUpdate, UserResponse, MessageResponse
 
 router = APIRouter()
 
 @router.get("/profile", response_model=UserResponse)
-def get_user_profile(current_user: User = Depends(get_current_user)):
+async def get_user_profile(current_user: User = Depends(get_current_user)):
     """Get current user's profile"""
     return current_user
 
 @router.put("/profile", response_model=UserResponse)
-def update_user_profile(
+async def update_user_profile(
     user_data: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update current user's profile"""
-    update_data = user_data.dict(exclude_unset=True)
+    update_data = user_data.model_dump(exclude_unset=True)
     
     # Check if email or username is being changed and if it's already taken
+    # (one query for both fields)
+    conflict_filters = []
     if "email" in update_data:
-        existing_user = db.query(User).filter(
-            User.email == update_data["email"],
-            User.id != current_user.id
-        ).first()
-        if existing_user:
+        conflict_filters.append(User.email == update_data["email"])
+    if "username" in update_data:
+        conflict_filters.append(User.username == update_data["username"])
+    
+    if conflict_filters:
+        result = await db.execute(
+            select(User.email, User.username).where(
+                User.id != current_user.id,
+                or_(*conflict_filters)
+            )
+        )
+        conflicts = result.all()
+        
+        if "email" in update_data and any(row.email == update_data["email"] for row in conflicts):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
-    
-    if "username" in update_data:
-        existing_user = db.query(User).filter(
-            User.username == update_data["username"],
-            User.id != current_user.id
-        ).first()
-        if existing_user:
+        
+        if conflicts:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already taken"
             )
     
-    # Update user fields
-    for field, value in update_data.items():
-        setattr(current_user, field, value)
+    if not update_data:
+        return current_user
     
+    # Update user fields with a single UPDATE ... RETURNING. current_user is
+    # detached first: RETURNING does not overwrite an instance already in
+    # the identity map, so the row populates a fresh one instead
+    db.expunge(current_user)
     try:
-        db.commit()
-        db.refresh(current_user)
-        return current_user
+        user = await db.scalar(
+            update(User)
+            .where(User.id == current_user.id)
+            .values(**update_data)
+            .returning(User)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return user
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Profile update failed"
         )
 
 @router.put("/reset-time", response_model=UserResponse)
-def update_reset_time(
+async def update_reset_time(
     reset_hour: int,
     reset_minute: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user's daily task reset time"""
     if not (0 <= reset_hour <= 23):
@@ -81,21 +98,37 @@ def update_reset_time(
             detail="Reset minute must be between 0 and 59"
         )
     
-    current_user.reset_hour = reset_hour
-    current_user.reset_minute = reset_minute
+    # Same UPDATE ... RETURNING approach as update_user_profile
+    db.expunge(current_user)
+    user = await db.scalar(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(reset_hour=reset_hour, reset_minute=reset_minute)
+        .returning(User)
+        .execution_options(synchronize_session=False)
+    )
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    await db.commit()
+    return user
 
 @router.delete("/account", response_model=MessageResponse)
-def delete_account(
+async def delete_account(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete current user's account and all associated data"""
-    # This will cascade delete all tasks due to the relationship
-    db.delete(current_user)
-    db.commit()
+    # Bulk-delete the user's tasks first rather than letting the ORM cascade
+    # load and delete them one row at a time
+    await db.execute(
+        delete(Task)
+        .where(Task.user_id == current_user.id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(User)
+        .where(User.id == current_user.id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
     
     return {"message": "Account deleted successfully"} 
\ No newline at end of file
@@ -1,7 +1,12 @@
-from pydantic import BaseModel, EmailStr, validator
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from typing import Optional, List, Annotated
 from datetime import datetime, date
 
+# Constrained types enforced by pydantic-core, without a Python validator call
+Priority = Annotated[int, Field(ge=1, le=3, description="1 (Low), 2 (Medium), or 3 (High)")]
+ResetHour = Annotated[int, Field(ge=0, le=23)]
+ResetMinute = Annotated[int, Field(ge=0, le=59)]
+
 # User Schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -11,7 +16,8 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
     
-    @validator('password')
+    @field_validator('password')
+    @classmethod
     def validate_password(cls, v):
         v = v.strip()
         if len(v) < 8:
@@ -22,20 +28,8 @@ class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     username: Optional[str] = None
     full_name: Optional[str] = None
-    reset_hour: Optional[int] = None
-    reset_minute: Optional[int] = None
-    
-    @validator('reset_hour')
-    def validate_reset_hour(cls, v):
-        if v is not None and (v < 0 or v > 23):
-            raise ValueError('Reset hour must be between 0 and 23')
-        return v
-    
-    @validator('reset_minute')
-    def validate_reset_minute(cls, v):
-        if v is not None and (v < 0 or v > 59):
-            raise ValueError('Reset minute must be between 0 and 59')
-        return v
+    reset_hour: Optional[ResetHour] = None
+    reset_minute: Optional[ResetMinute] = None
 
 class UserResponse(UserBase):
     id: int
@@ -46,24 +40,18 @@ class UserResponse(UserBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Task Schemas
 class TaskBase(BaseModel):
     title: str
     description: Optional[str] = None
-    priority: Optional[int] = 1
+    priority: Priority = 1
     category: Optional[str] = None
     due_date: Optional[date] = None
     
-    @validator('priority')
-    def validate_priority(cls, v):
-        if v not in [1, 2, 3]:
-            raise ValueError('Priority must be 1 (Low), 2 (Medium), or 3 (High)')
-        return v
-    
-    @validator('category')
+    @field_validator('category')
+    @classmethod
     def validate_category(cls, v):
         if v is not None and len(v.strip()) == 0:
             return None
@@ -76,22 +64,26 @@ class TaskUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     is_completed: Optional[bool] = None
-    priority: Optional[int] = None
+    priority: Optional[Priority] = None
     category: Optional[str] = None
     due_date: Optional[date] = None
     
-    @validator('priority')
-    def validate_priority(cls, v):
-        if v is not None and v not in [1, 2, 3]:
-            raise ValueError('Priority must be 1 (Low), 2 (Medium), or 3 (High)')
-        return v
-    
-    @validator('category')
+    @field_validator('category')
+    @classmethod
     def validate_category(cls, v):
         if v is not None and len(v.strip()) == 0:
             return None
         return v
 
+class BulkTaskIDs(BaseModel):
+    task_ids: Annotated[List[int], Field(min_length=1, max_length=1000)]
+    
+    @field_validator('task_ids')
+    @classmethod
+    def dedupe_task_ids(cls, v):
+        # Drop repeated ids, keeping first-seen order
+        return list(dict.fromkeys(v))
+
 class TaskResponse(TaskBase):
     id: int
     is_completed: bool
@@ -100,8 +92,7 @@ class TaskResponse(TaskBase):
     updated_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Authentication Schemas
 class Token(BaseModel):
@@ -1,13 +1,19 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 from dotenv import load_dotenv
 
+from config import get_settings
 from utils.database import get_db
 from models.user import User
 
@@ -19,9 +25,23 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
 
+# Per-request user lookup, built once so its compiled form is cached
+SELECT_USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Process pool for CPU-bound bcrypt work, so hashing never blocks the event
+# loop. Created on first use and sized per web worker (every gunicorn worker
+# gets its own pool)
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=get_settings().password_hash_workers)
+    return _hash_pool
+
 # JWT token security
 security = HTTPBearer()
 
@@ -33,6 +53,16 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash in the hashing process pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_pool(), verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the hashing process pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_pool(), get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -53,22 +83,38 @@ def create_refresh_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+@functools.lru_cache(maxsize=4096)
+def _decode_token(token: str) -> Tuple[dict, float]:
+    """Verify signature and decode a JWT token, cached by the compact token
+
+    Raises JWTError for invalid tokens; lru_cache does not store raised
+    calls, so garbage tokens can't evict valid entries.
+    """
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return payload, float(payload.get("exp", 0))
+
 def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
     """Verify and decode a JWT token"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        token_type_check: str = payload.get("type")
-        
-        if username is None or token_type_check != token_type:
-            return None
-        return payload
+        cached_payload, exp_ts = _decode_token(token)
     except JWTError:
         return None
+    
+    # A cached decode stays valid only until the token's own expiry
+    if exp_ts <= time.time():
+        return None
+    
+    payload = dict(cached_payload)
+    username: str = payload.get("sub")
+    token_type_check: str = payload.get("type")
+    
+    if username is None or token_type_check != token_type:
+        return None
+    return payload
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """Get the current authenticated user"""
     credentials_exception = HTTPException(
@@ -85,7 +131,8 @@ def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    result = await db.execute(SELECT_USER_BY_USERNAME, {"username": username})
+    user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
     
@@ -97,11 +144,12 @@ def get_current_user(
     
     return user
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
     """Authenticate a user with username and password"""
-    user = db.query(User).filter(User.username == username).first()
+    result = await db.execute(SELECT_USER_BY_USERNAME, {"username": username})
+    user = result.scalar_one_or_none()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user 
\ No newline at end of file
@@ -1,47 +1,157 @@
-from sqlalchemy import create_engine
+from typing import AsyncGenerator
+from sqlalchemy import event, literal, any_, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import time
+import asyncio
+import logging
 
-load_dotenv()
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
 
 # Database URL from environment - default to SQLite for simplicity
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sisyphus.db")
+DATABASE_URL = settings.database_url
 
 # Convert postgres:// to postgresql:// for SQLAlchemy compatibility
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Create SQLAlchemy engine
+# Async driver URL (asyncpg for PostgreSQL, aiosqlite for SQLite)
+if DATABASE_URL.startswith("sqlite:"):
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite:", "sqlite+aiosqlite:", 1)
+elif DATABASE_URL.startswith("postgresql:"):
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql:", "postgresql+asyncpg:", 1)
+else:
+    ASYNC_DATABASE_URL = DATABASE_URL
+
+# Create SQLAlchemy async engine
 if DATABASE_URL.startswith("sqlite"):
     # SQLite specific configuration
-    engine = create_engine(
-        DATABASE_URL,
+    engine = create_async_engine(
+        ASYNC_DATABASE_URL,
         pool_pre_ping=True,
         pool_recycle=300,
-        echo=os.getenv("DEBUG", "False").lower() == "true",
-        connect_args={"check_same_thread": False}
+        query_cache_size=1200,
+        echo=settings.debug
     )
+    
+    # WAL lets readers keep going while the purge deletes; NORMAL sync is
+    # safe under WAL and avoids an fsync per commit
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
 else:
     # PostgreSQL configuration
-    engine = create_engine(
-        DATABASE_URL,
+    # Pool sized for many concurrent requests per worker; JIT is disabled
+    # since it only slows down short OLTP queries
+    engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=20,
+        max_overflow=40,
+        pool_timeout=5,
         pool_pre_ping=True,
-        pool_recycle=300,
-        echo=os.getenv("DEBUG", "False").lower() == "true"
+        pool_recycle=1800,
+        query_cache_size=1200,
+        echo=settings.debug,
+        connect_args={
+            "server_settings": {"jit": "off"},
+            "statement_cache_size": 1024,
+            "prepared_statement_cache_size": 512
+        }
     )
 
+# Log statements slower than SLOW_QUERY_MS (default 100 ms)
+SLOW_QUERY_SECONDS = settings.slow_query_ms / 1000
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    if elapsed > SLOW_QUERY_SECONDS:
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _discard_query_timer(context):
+    # A failed statement never reaches after_cursor_execute; drop its start
+    # time so it doesn't pile up on the pooled connection
+    if context.connection is None:
+        return
+    timers = context.connection.info.get("query_start_time")
+    if timers:
+        timers.pop()
+
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False keeps loaded attributes usable after commit without
+# an implicit (and, under asyncio, illegal) lazy reload
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+def dialect_insert(entity):
+    """Dialect-specific insert() for the configured database (supports ON CONFLICT)"""
+    if engine.dialect.name == "postgresql":
+        return postgresql_insert(entity)
+    return sqlite_insert(entity)
+
+# Max ids bound per IN (...) statement, below SQLite's bound-parameter limit
+ID_BATCH_SIZE = 900
+
+def id_filters(column, ids, dialect_name: str):
+    """WHERE clauses matching column against ids, one per statement to execute
+
+    PostgreSQL binds the whole list as a single array (column = ANY(:ids)),
+    so every call shares one statement/plan regardless of length. Other
+    databases get IN (...) clauses in batches of ID_BATCH_SIZE.
+    """
+    if dialect_name == "postgresql":
+        return [column == any_(literal(ids, ARRAY(Integer)))]
+    return [
+        column.in_(ids[i:i + ID_BATCH_SIZE])
+        for i in range(0, len(ids), ID_BATCH_SIZE)
+    ]
+
+async def warm_up_pool():
+    """Open pool_size connections up front so early requests don't pay for connecting"""
+    if engine.dialect.name == "sqlite":
+        # aiosqlite connections are not pooled (NullPool), nothing to warm
+        return
+    # Best effort: a failed connect is logged, never fatal to startup
+    results = await asyncio.gather(
+        *(engine.connect() for _ in range(engine.pool.size())),
+        return_exceptions=True
+    )
+    failures = [result for result in results if isinstance(result, BaseException)]
+    for conn in results:
+        if not isinstance(conn, BaseException):
+            await conn.close()
+    
+    if failures:
+        logger.warning(
+            "Pool warm-up: %d of %d connections failed",
+            len(failures), len(results), exc_info=failures[0]
+        )
 
 # Create Base class for models
 Base = declarative_base()
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
@@ -0,0 +1,130 @@
+from typing import List
+
+# Methods advertised in CORS preflight responses
+ALL_METHODS = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
+
+def _get_header(scope, name: bytes):
+    """Return the first value of a request header straight from the ASGI scope"""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+async def _send_plain_response(send, status_code: int, body: bytes):
+    """Send a minimal text/plain response"""
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class ASGICORSMiddleware:
+    """CORS middleware working on the raw ASGI scope (no Request/Response wrapping)
+
+    Mirrors the behaviour of Starlette's CORSMiddleware configured with
+    allow_credentials=True and allow_methods/allow_headers set to "*".
+    """
+
+    def __init__(self, app, allow_origins: List[str], max_age: int = 600):
+        self.app = app
+        self.allow_all_origins = "*" in allow_origins
+        self.allow_origins = {origin.strip().encode("latin-1") for origin in allow_origins}
+        self.preflight_headers = [
+            (b"access-control-allow-methods", ", ".join(ALL_METHODS).encode("latin-1")),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+            (b"access-control-allow-credentials", b"true"),
+        ]
+
+    def is_allowed_origin(self, origin: bytes) -> bool:
+        return self.allow_all_origins or origin in self.allow_origins
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = _get_header(scope, b"origin")
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and _get_header(scope, b"access-control-request-method") is not None:
+            await self.preflight_response(scope, origin, send)
+            return
+
+        if not self.is_allowed_origin(origin):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"access-control-allow-origin", origin))
+                headers.append((b"access-control-allow-credentials", b"true"))
+                headers.append((b"vary", b"Origin"))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def preflight_response(self, scope, origin: bytes, send):
+        """Answer a CORS preflight request without reaching the application"""
+        if not self.is_allowed_origin(origin):
+            await _send_plain_response(send, 400, b"Disallowed CORS origin")
+            return
+
+        headers = [
+            (b"access-control-allow-origin", origin),
+            (b"vary", b"Origin"),
+            (b"content-length", b"0"),
+            *self.preflight_headers,
+        ]
+        requested_headers = _get_header(scope, b"access-control-request-headers")
+        if requested_headers is not None:
+            headers.append((b"access-control-allow-headers", requested_headers))
+
+        await send({"type": "http.response.start", "status": 204, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+class ASGITrustedHostMiddleware:
+    """Reject requests whose Host header is not in allowed_hosts
+
+    Supports exact hosts, "*.example.com" wildcard subdomains and "*" (allow all).
+    """
+
+    def __init__(self, app, allowed_hosts: List[str]):
+        self.app = app
+        self.allow_any = "*" in allowed_hosts
+        self.exact_hosts = set()
+        self.wildcard_suffixes = []
+        for pattern in allowed_hosts:
+            pattern = pattern.strip().lower().encode("latin-1")
+            if pattern.startswith(b"*."):
+                self.wildcard_suffixes.append(pattern[1:])
+            else:
+                self.exact_hosts.add(pattern)
+
+    def is_valid_host(self, host: bytes) -> bool:
+        host = host.split(b":", 1)[0].lower()
+        if host in self.exact_hosts:
+            return True
+        return any(host.endswith(suffix) for suffix in self.wildcard_suffixes)
+
+    async def __call__(self, scope, receive, send):
+        if self.allow_any or scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        host = _get_header(scope, b"host") or b""
+        if not self.is_valid_host(host):
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1008})
+            else:
+                await _send_plain_response(send, 400, b"Invalid host header")
+            return
+
+        await self.app(scope, receive, send)
@@ -1,102 +1,376 @@
-import os
-import redis
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from utils.database import SessionLocal
+import sys
+import time
+import queue
+import asyncio
+import logging
+import logging.handlers
+from redis import asyncio as aioredis
+from redis.exceptions import LockError
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+from sqlalchemy import select, delete, exists, func, or_, text
+from sqlalchemy.exc import DBAPIError
+from utils.database import SessionLocal, engine, id_filters
 from models.task import Task
 from models.user import User
-from dotenv import load_dotenv
+from config import get_settings
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# The purge lock expires this long after its last refresh, so a crashed
+# purger is replaced within a minute
+PURGE_LOCK_TTL = 60
+LOCK_REFRESH_INTERVAL = 20
+
+# Atomically mark the purge done and clear the scheduled flag, but only if the
+# flag still holds the value this run started from; a purge scheduled while
+# this one was running is left in place for the next run
+COMPLETE_PURGE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+# How long a long-lived scheduler may reuse the reset-time buckets before
+# reloading them; bounds how late new users or reset-time changes are seen
+RESET_BUCKET_TTL = 300
+
+# On PostgreSQL, tasks may be range-partitioned by created_at day (see
+# migrate_partition_tasks.py); partitions are created this many days ahead
+TASK_PARTITION_DAYS_AHEAD = 7
+
+def _next_hour(moment: datetime) -> datetime:
+    """Start of the hour after moment, as an aware UTC datetime"""
+    if moment.tzinfo is None:
+        # SQLite returns naive datetimes; stored values are UTC
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+def task_partition_name(day: date) -> str:
+    """Name of the tasks partition holding rows created on day (UTC)"""
+    return f"tasks_{day:%Y%m%d}"
+
+def task_partition_ddl(day: date) -> str:
+    """CREATE TABLE statement for the tasks partition covering day (UTC)"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {task_partition_name(day)} PARTITION OF tasks "
+        f"FOR VALUES FROM ('{day.isoformat()} 00:00:00+00') "
+        f"TO ('{(day + timedelta(days=1)).isoformat()} 00:00:00+00')"
+    )
+
+def _most_recent_reset(reset_hour: int, reset_minute: int, today_start: datetime, now: datetime) -> datetime:
+    """Latest reset moment at or before now (today's if it has passed, otherwise yesterday's)"""
+    cutoff = today_start + timedelta(hours=reset_hour, minutes=reset_minute)
+    if cutoff > now:
+        cutoff -= timedelta(days=1)
+    return cutoff
+
+def _fully_expired_before(reset_times, today_start: datetime, now: datetime) -> datetime:
+    """Moment before which every user's tasks have expired
+
+    Each user's tasks expire at their most recent reset time; the earliest
+    of those bounds what can be discarded wholesale.
+    """
+    return min(
+        (_most_recent_reset(reset_hour, reset_minute, today_start, now)
+         for reset_hour, reset_minute in reset_times),
+        default=today_start
+    )
+
+async def _ensure_task_partitions(db, today: date):
+    """Create the partitions for today and the next TASK_PARTITION_DAYS_AHEAD days"""
+    for offset in range(TASK_PARTITION_DAYS_AHEAD + 1):
+        day = today + timedelta(days=offset)
+        try:
+            await db.execute(text(task_partition_ddl(day)))
+            await db.commit()
+        except DBAPIError as exc:
+            # Usually rows for that day already landed in the default
+            # partition; the row-delete path still purges them
+            await db.rollback()
+            logger.warning("Skipping partition %s: %s", task_partition_name(day), exc.orig)
+
+async def _drop_expired_task_partitions(db, expired_before: datetime) -> int:
+    """Detach and drop daily partitions whose whole range is older than expired_before"""
+    result = await db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'tasks'::regclass"
+    ))
+    partition_names = result.scalars().all()
+    await db.commit()
+    
+    quote = db.bind.dialect.identifier_preparer.quote
+    dropped_count = 0
+    for name in partition_names:
+        try:
+            day = datetime.strptime(name, "tasks_%Y%m%d").replace(tzinfo=timezone.utc)
+        except ValueError:
+            # Default partition or anything not created by this scheduler
+            continue
+        
+        if day + timedelta(days=1) <= expired_before:
+            # Metadata-only; no per-row work regardless of partition size
+            await db.execute(text(f"ALTER TABLE tasks DETACH PARTITION {quote(name)}"))
+            await db.execute(text(f"DROP TABLE {quote(name)}"))
+            await db.commit()
+            dropped_count += 1
+    
+    return dropped_count
+
+async def _purge_before(db, user_filter, cutoff: datetime, max_rows_per_chunk: int) -> int:
+    """Delete tasks matching user_filter created before cutoff, returning the count
+
+    Deletes in hourly buckets of created_at (oldest first), at most
+    max_rows_per_chunk rows per statement, committing after each so no
+    single transaction holds locks on a large part of the table.
+    """
+    expired = (user_filter, Task.created_at < cutoff)
+    oldest_expired = select(func.min(Task.created_at)).where(*expired)
+    
+    deleted_count = 0
+    oldest = await db.scalar(oldest_expired)
+    
+    while oldest is not None:
+        bucket_end = _next_hour(oldest)
+        
+        # Everything older than bucket_end is already gone, so the
+        # upper bound alone selects this bucket
+        while True:
+            chunk_ids = (
+                select(Task.id)
+                .where(*expired, Task.created_at < bucket_end)
+                .limit(max_rows_per_chunk)
+            )
+            # The created_at bound also lets a partitioned table prune
+            result = await db.execute(
+                delete(Task)
+                .where(Task.id.in_(chunk_ids), Task.created_at < bucket_end)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            deleted_count += result.rowcount
+            if result.rowcount < max_rows_per_chunk:
+                break
+        
+        if bucket_end >= cutoff:
+            break
+        
+        # Jump straight to the next non-empty bucket
+        oldest = await db.scalar(oldest_expired)
+        if oldest is not None and _next_hour(oldest) <= bucket_end:
+            oldest = bucket_end
+    
+    return deleted_count
 
 class TaskScheduler:
     def __init__(self):
-        self.redis_enabled = os.getenv("REDIS_ENABLED", "False").lower() == "true"
+        settings = get_settings()
+        self.redis_enabled = settings.redis_enabled
         self.redis_client = None
+        self._reset_buckets = None
+        self._reset_buckets_loaded_at = 0.0
+        self._tasks_partitioned = None
         
         if self.redis_enabled:
-            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-            self.redis_client = redis.from_url(redis_url)
+            # Async client so Redis round trips never block the event loop
+            # the purge's database work runs on
+            pool = aioredis.ConnectionPool.from_url(
+                settings.redis_url,
+                max_connections=32,
+                retry_on_timeout=True,
+                socket_keepalive=True
+            )
+            self.redis_client = aioredis.Redis(connection_pool=pool)
+            self._complete_purge = self.redis_client.register_script(COMPLETE_PURGE_SCRIPT)
     
-    def purge_expired_tasks(self):
-        """Purge tasks that have passed their reset time"""
-        db = SessionLocal()
-        try:
-            # Get all users with their reset times
-            users = db.query(User).all()
-            
-            for user in users:
-                self._purge_user_tasks(db, user)
-                
-        finally:
-            db.close()
+    async def _get_reset_buckets(self, db) -> Dict[Tuple[int, int], List[int]]:
+        """User ids grouped by (reset_hour, reset_minute), cached for RESET_BUCKET_TTL"""
+        if (
+            self._reset_buckets is None
+            or time.monotonic() - self._reset_buckets_loaded_at > RESET_BUCKET_TTL
+        ):
+            result = await db.execute(select(User.reset_hour, User.reset_minute, User.id))
+            buckets = {}
+            for reset_hour, reset_minute, user_id in result:
+                if reset_hour is not None and reset_minute is not None:
+                    buckets.setdefault((reset_hour, reset_minute), []).append(user_id)
+            self._reset_buckets = buckets
+            self._reset_buckets_loaded_at = time.monotonic()
+        return self._reset_buckets
     
-    def _purge_user_tasks(self, db: Session, user: User):
-        """Purge tasks for a specific user based on their reset time"""
-        now = datetime.utcnow()
-        
-        # Calculate the user's reset time for today
-        reset_time = now.replace(
-            hour=user.reset_hour,
-            minute=user.reset_minute,
-            second=0,
-            microsecond=0
-        )
-        
-        # If reset time hasn't passed today, don't purge
-        if now < reset_time:
-            return
+    async def _is_tasks_partitioned(self, db) -> bool:
+        """Whether tasks is a partitioned PostgreSQL table (checked once)"""
+        if self._tasks_partitioned is None:
+            self._tasks_partitioned = db.bind.dialect.name == "postgresql" and bool(
+                await db.scalar(text(
+                    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                    "WHERE partrelid = to_regclass('tasks'))"
+                ))
+            )
+        return self._tasks_partitioned
+    
+    async def purge_expired_tasks(self, max_rows_per_chunk: int = 10000):
+        """Purge tasks that have passed their reset time
+
+        Users are grouped by reset time; each group loses every task
+        created before its most recent reset (today's if it has passed,
+        otherwise yesterday's). When tasks
+        is partitioned by day, partitions that have fully expired for every
+        user are dropped first, leaving only the edges to row deletes.
+        """
+        now = datetime.now(timezone.utc)
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         
-        # Delete all tasks for this user that were created before the reset time
-        deleted_count = db.query(Task).filter(
-            Task.user_id == user.id,
-            Task.created_at < reset_time
-        ).delete()
+        deleted_count = 0
+        async with SessionLocal() as db:
+            buckets = await self._get_reset_buckets(db)
+            
+            if await self._is_tasks_partitioned(db):
+                await _ensure_task_partitions(db, today_start.date())
+                
+                # Users without a reset time are never purged, so their rows
+                # would be lost with a dropped partition
+                unscheduled_users = await db.scalar(select(exists().where(
+                    or_(User.reset_hour.is_(None), User.reset_minute.is_(None))
+                )))
+                if unscheduled_users:
+                    logger.warning("Users without a reset time exist, not dropping task partitions")
+                else:
+                    dropped_count = await _drop_expired_task_partitions(
+                        db, _fully_expired_before(buckets, today_start, now)
+                    )
+                    if dropped_count > 0:
+                        logger.info("Dropped %d expired task partitions", dropped_count)
+            
+            # Every group is purged up to its most recent reset, so a single
+            # run per day still catches users whose reset comes later
+            for (reset_hour, reset_minute), user_ids in buckets.items():
+                cutoff = _most_recent_reset(reset_hour, reset_minute, today_start, now)
+                
+                for user_filter in id_filters(Task.user_id, user_ids, db.bind.dialect.name):
+                    deleted_count += await _purge_before(db, user_filter, cutoff, max_rows_per_chunk)
         
         if deleted_count > 0:
-            db.commit()
-            print(f"Purged {deleted_count} tasks for user {user.username}")
+            logger.info("Purged %d tasks", deleted_count)
     
-    def schedule_daily_purge(self):
+    async def schedule_daily_purge(self):
         """Schedule daily task purge (if Redis is available)"""
         if not self.redis_enabled:
-            print("Redis not enabled, skipping scheduled purge")
+            logger.info("Redis not enabled, skipping scheduled purge")
             return
         
         # This is a simple implementation
         # In production, you might want to use Celery or APScheduler
         try:
-            # Set a flag to indicate purge is scheduled
-            self.redis_client.set("task_purge_scheduled", "true", ex=86400)  # 24 hours
-            print("Daily task purge scheduled")
-        except Exception as e:
-            print(f"Failed to schedule purge: {e}")
+            # Set a flag to indicate purge is scheduled; a fresh value each
+            # time lets check_and_purge tell a re-schedule from the one it ran
+            scheduled_at = datetime.now(timezone.utc).isoformat()
+            await self.redis_client.set("task_purge_scheduled", scheduled_at, ex=86400)  # 24 hours
+            logger.info("Daily task purge scheduled")
+        except Exception:
+            logger.exception("Failed to schedule purge")
     
-    def check_and_purge(self):
+    async def check_and_purge(self):
         """Check if purge is needed and execute it"""
         if not self.redis_enabled:
             # Without Redis, just purge directly
-            self.purge_expired_tasks()
+            await self.purge_expired_tasks()
             return
         
         try:
-            # Check if purge was scheduled
-            if self.redis_client.get("task_purge_scheduled"):
-                self.purge_expired_tasks()
-                # Remove the flag
-                self.redis_client.delete("task_purge_scheduled")
-                print("Scheduled task purge completed")
-        except Exception as e:
-            print(f"Failed to check purge status: {e}")
+            # Another instance already purged today
+            today = datetime.now(timezone.utc).date().isoformat()
+            if await self.redis_client.get("task_purge_done") == today.encode():
+                return
+            
+            # Only one instance purges at a time; the others skip this round
+            lock = self.redis_client.lock("lock:task_purge", timeout=PURGE_LOCK_TTL, blocking=False)
+            if not await lock.acquire(blocking=False):
+                return
+            
+            try:
+                # The flag is only cleared once the purge succeeds, so if this
+                # instance dies the next lock holder still sees it
+                scheduled = await self.redis_client.get("task_purge_scheduled")
+                if scheduled:
+                    await self._purge_holding_lock(lock)
+                    await self._complete_purge(
+                        keys=["task_purge_scheduled", "task_purge_done"],
+                        args=[scheduled, today, 86400]
+                    )
+                    logger.info("Scheduled task purge completed")
+            finally:
+                try:
+                    await lock.release()
+                except LockError:
+                    logger.warning("Purge lock expired before it was released")
+        except Exception:
+            logger.exception("Failed to check purge status")
+
+    async def _purge_holding_lock(self, lock):
+        """Purge while keeping the lock alive; abort if the lock can't be kept"""
+        purge = asyncio.create_task(self.purge_expired_tasks())
+        keep_alive = asyncio.create_task(self._keep_lock_alive(lock))
+        try:
+            await asyncio.wait({purge, keep_alive}, return_when=asyncio.FIRST_COMPLETED)
+            if not purge.done():
+                # Without the lock another instance may start purging; stop
+                # here (every chunk is already committed) and raise the reason
+                logger.error("Lost the purge lock, aborting purge")
+                keep_alive.result()
+            purge.result()
+        finally:
+            keep_alive.cancel()
+            purge.cancel()
+            # Let a cancelled purge finish rolling back and closing its
+            # session before the caller releases the lock
+            await asyncio.gather(purge, keep_alive, return_exceptions=True)
+    
+    async def _keep_lock_alive(self, lock):
+        """Extend the purge lock every LOCK_REFRESH_INTERVAL seconds"""
+        while True:
+            await asyncio.sleep(LOCK_REFRESH_INTERVAL)
+            await lock.extend(PURGE_LOCK_TTL, replace_ttl=True)
 
 # Global scheduler instance
 scheduler = TaskScheduler()
 
-def purge_tasks_command():
-    """Command-line function to purge tasks"""
-    print("Starting task purge...")
-    scheduler.purge_expired_tasks()
-    print("Task purge completed")
+def purge_tasks_command() -> int:
+    """Command-line function to purge tasks, returning the process exit code"""
+    logger.info("Starting task purge...")
+    started = time.perf_counter()
+    try:
+        asyncio.run(_run_purge())
+    except Exception:
+        logger.exception("Task purge failed")
+        return 1
+    
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info("Task purge completed in %.1f ms", elapsed_ms, extra={"elapsed_ms": elapsed_ms})
+    return 0
+
+async def _run_purge():
+    """Purge once and release pooled connections before the event loop closes"""
+    try:
+        await scheduler.purge_expired_tasks()
+    finally:
+        await engine.dispose()
+
+def _configure_logging():
+    """Log through a queue so emitting records never blocks on terminal I/O"""
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(log_queue)])
+    listener.start()
+    return listener
 
 if __name__ == "__main__":
-    purge_tasks_command() 
\ No newline at end of file
+    listener = _configure_logging()
+    try:
+        exit_code = purge_tasks_command()
+    finally:
+        listener.stop()
+    sys.exit(exit_code) 
\ No newline at end of file
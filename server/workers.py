@@ -0,0 +1,14 @@
+"""
+Gunicorn worker class for production deployments
+"""
+
+from uvicorn.workers import UvicornWorker
+
+class SisyphusUvicornWorker(UvicornWorker):
+    """UvicornWorker with uvloop, httptools and no per-request access log"""
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "loop": "uvloop",
+        "http": "httptools",
+        "access_log": False,
+    }